@@ -22,14 +22,15 @@ def calculate_min_buffer_depth(
     """
     min_required_depth = window_size
 
-    for match in active_matches:
-        # Calculate how many lines this match spans
-        match_length = window_size + (match.next_window_index - 1)
+    # Loop-invariant offsets: first tracked line still in the buffer, and the offset
+    # from a match's start to its last line (window_size + (next_window_index - 1) - 1)
+    buffer_first_tracked = line_num_input_tracked - line_buffer_length + 1
+    last_line_offset = window_size - 2
 
-        # Calculate buffer depth based on tracked line numbers
-        buffer_first_tracked = line_num_input_tracked - line_buffer_length + 1
+    for match in active_matches:
+        # Calculate the tracked line span of this match
         match_first_tracked = match.tracked_line_at_start
-        match_last_tracked = match.tracked_line_at_start + match_length - 1
+        match_last_tracked = match_first_tracked + match.next_window_index + last_line_offset
 
         # Calculate overlap between buffer and match
         overlap_start = max(buffer_first_tracked, match_first_tracked)
@@ -1,7 +1,8 @@
 """Match divergence detection and handling."""
 
-from collections import defaultdict, deque
+from collections import deque
 from collections.abc import Callable
+from itertools import islice
 from typing import Optional, Union
 
 from .hashing import BufferedLine
@@ -18,8 +19,7 @@ def handle_diverged_matches(
     window_size: int,
     save_sequence_callback: Optional[Callable[[Union[str, bytes]], None]],
     annotate: bool,
-    annotation_format: str,
-    delimiter: Union[str, bytes],
+    format_annotation: Callable[[dict[str, int]], Union[str, bytes]],
     inverse: bool,
     explain: bool,
 ) -> None:
@@ -27,10 +27,10 @@ def handle_diverged_matches(
 
     Strategy:
     1. Filter out incomplete subsequences (matches that end at same position but started later)
-    2. Group matches by starting position
-    3. For each group, check if any active match from same position is still running
-    4. If no active matches from that position, record the longest diverged match
-    5. Among matches of same length, record the earliest (by first_output_line)
+    2. The longest matches share a starting position; check if any active match from
+       that position is still running
+    3. If no active matches from that position, record the longest diverged match
+    4. Among matches of same length, record the earliest (by first_output_line)
 
     Args:
         all_diverged: List of diverged matches
@@ -41,8 +41,7 @@ def handle_diverged_matches(
         window_size: Window size for deduplication
         save_sequence_callback: Optional callback for saving sequences
         annotate: Whether to add annotations
-        annotation_format: Template for annotations
-        delimiter: Delimiter being used
+        format_annotation: Annotation formatter bound to the output mode
         inverse: Whether in inverse mode
         explain: Whether to print explanations
     """
@@ -50,91 +49,76 @@ def handle_diverged_matches(
         return
 
     # Filter out incomplete subsequences
-    # When multiple matches end at the same position, keep only the longest (earliest start)
-
-    # Calculate match info for all diverged matches
-    match_info = []  # List of (match, match_length, match_end)
-    end_positions = set()
-    for match in all_diverged:
-        length = match.next_window_index
-        match_start = match.tracked_line_at_start
-        match_length = window_size + (length - 1)
-        match_end = match_start + match_length - 1
-        end_positions.add(match_end)
-        match_info.append((match, match_length, match_end))
-
-    # All diverged matches should end at the same position
-    if len(end_positions) > 1:
-        raise ValueError("diverged matches found at different ending positions")
-
-    # Find the maximum length among all matches
-    max_length = max(info[1] for info in match_info)  # info[1] is match_length
-
-    # Keep only matches with maximum length
-    all_diverged = [info[0] for info in match_info if info[1] == max_length]
-
-    # Group diverged matches by starting position (INPUT line, not output line)
-    by_start_pos: dict[int, list[SubsequenceMatch]] = defaultdict(list)
+    # When multiple matches end at the same position, keep only the longest (earliest start).
+    # Single pass: check the shared end position and collect the longest matches.
+    match_end: Optional[int] = None
+    max_windows = 0
+    longest_matches: list[SubsequenceMatch] = []
     for match in all_diverged:
-        by_start_pos[match.tracked_line_at_start].append(match)
-
-    # Process each starting position IN ORDER (earliest first)
-    for start_pos in sorted(by_start_pos.keys()):
-        matches_at_pos = by_start_pos[start_pos]
-
-        # Check if any active match is still running from this starting position
-        has_active_from_pos = any(m.tracked_line_at_start == start_pos for m in active_matches)
-
-        if has_active_from_pos:
-            # Don't record yet - longer match may still be running
-            continue
-
-        # Find longest match(es) from this position
-        max_length_at_pos = max(m.next_window_index for m in matches_at_pos)
-        longest_matches = [m for m in matches_at_pos if m.next_window_index == max_length_at_pos]
-
-        # If multiple matches of same length, pick earliest (by first_output_line)
-        if len(longest_matches) == 1:
-            match_to_record = longest_matches[0]
-        else:
-            # Pick earliest based on sequence first_output_line
-            def sort_key(match: SubsequenceMatch) -> tuple[int, Union[int, float, str]]:
-                orig_line = match.get_original_line()
-                if orig_line == "preloaded":
-                    return (0, 0)  # Preloaded sequences come first
-                elif orig_line == "pending":
-                    return (2, 0)  # Pending sequences come last
-                else:
-                    return (1, orig_line)  # Regular sequences sorted by line number
-
-            match_to_record = min(longest_matches, key=sort_key)
-
-        # Calculate actual number of lines matched
-        matched_length = match_to_record.next_window_index
-        lines_matched = window_size + (matched_length - 1)
-
-        # Extract matched lines from buffer if save callback is configured
-        matched_lines = None
-        if save_sequence_callback and lines_matched <= len(line_buffer):
-            matched_lines = [line_buffer[i].line for i in range(lines_matched)]
-
-        # Record this match (polymorphic - will save for HistorySubsequenceMatch only)
-        match_to_record.record_match(matched_length, matched_lines, save_sequence_callback)
-
-        # Handle line skipping/outputting based on mode
-        handle_matched_lines(
-            lines_matched,
-            match_to_record,
-            line_buffer,
-            diverged_match_ranges,
-            output_buffer,
-            annotate,
-            annotation_format,
-            delimiter,
-            window_size,
-            inverse,
-            explain,
-        )
+        windows = match.next_window_index
+        end = match.tracked_line_at_start + window_size + windows - 2
+        if match_end is None:
+            match_end = end
+        elif end != match_end:
+            # All diverged matches should end at the same position
+            raise ValueError("diverged matches found at different ending positions")
+        if windows > max_windows:
+            max_windows = windows
+            longest_matches = [match]
+        elif windows == max_windows:
+            longest_matches.append(match)
+
+    # Sharing an end position and length, the longest matches share a start position too
+    start_pos = longest_matches[0].tracked_line_at_start
+
+    # Don't record yet if an active match is still running from this starting position -
+    # a longer match may still be running
+    for active in active_matches:
+        if active.tracked_line_at_start == start_pos:
+            return
+
+    # If multiple matches of same length, pick earliest (by first_output_line)
+    if len(longest_matches) == 1:
+        match_to_record = longest_matches[0]
+    else:
+        # Pick earliest based on sequence first_output_line
+        def sort_key(match: SubsequenceMatch) -> tuple[int, Union[int, str]]:
+            orig_line = match.get_original_line()
+            if orig_line == "preloaded":
+                return (0, 0)  # Preloaded sequences come first
+            elif orig_line == "pending":
+                return (2, 0)  # Pending sequences come last
+            else:
+                return (1, orig_line)  # Regular sequences sorted by line number
+
+        match_to_record = min(longest_matches, key=sort_key)
+
+    # Calculate actual number of lines matched
+    matched_length = match_to_record.next_window_index
+    lines_matched = window_size + (matched_length - 1)
+
+    # Extract matched lines from buffer if save callback is configured
+    matched_lines = None
+    if save_sequence_callback and lines_matched <= len(line_buffer):
+        # islice walks the deque once; indexing would re-walk it for every line
+        matched_lines = [buffered_line.line for buffered_line in islice(line_buffer, lines_matched)]
+
+    # Record this match (polymorphic - will save for HistorySubsequenceMatch only)
+    match_to_record.record_match(matched_length, matched_lines, save_sequence_callback)
+
+    # Handle line skipping/outputting based on mode
+    handle_matched_lines(
+        lines_matched,
+        match_to_record,
+        line_buffer,
+        diverged_match_ranges,
+        output_buffer,
+        annotate,
+        format_annotation,
+        window_size,
+        inverse,
+        explain,
+    )
 
 
 def handle_matched_lines(
@@ -144,8 +128,7 @@ def handle_matched_lines(
     diverged_match_ranges: list[tuple[int, int, Union[int, float, str], int]],
     output_buffer: deque[Union[str, bytes]],
     annotate: bool,
-    annotation_format: str,
-    delimiter: Union[str, bytes],
+    format_annotation: Callable[[dict[str, int]], Union[str, bytes]],
     window_size: int,
     inverse: bool,
     explain: bool,
@@ -159,8 +142,7 @@ def handle_matched_lines(
         diverged_match_ranges: List to append duplicate ranges to
         output_buffer: Buffer for output lines
         annotate: Whether to add annotations
-        annotation_format: Template for annotations
-        delimiter: Delimiter being used
+        format_annotation: Annotation formatter bound to the output mode
         window_size: Window size for deduplication
         inverse: Whether in inverse mode
         explain: Whether to print explanations
@@ -168,33 +150,34 @@ def handle_matched_lines(
     if matched_length <= 0 or matched_length > len(line_buffer):
         return
 
+    # Get original match position (shared by annotation, explain and the recorded range)
+    orig_line = match.get_original_line()
+
     # Collect annotation info before modifying buffer
-    should_annotate = annotate and not inverse and matched_length > 0
+    should_annotate = annotate and not inverse
     annotation_info = None
 
-    if should_annotate and len(line_buffer) >= matched_length:
-        dup_start = line_buffer[0].input_line_num
-        dup_end = line_buffer[matched_length - 1].input_line_num
-
-        # Get original match position
-        orig_line = match.get_original_line()
+    # Input line range of the matched lines, read once for annotation and explain
+    if should_annotate or explain:
+        start_line = line_buffer[0].input_line_num
+        end_line = line_buffer[matched_length - 1].input_line_num
 
+    if should_annotate:
         # Only annotate if orig_line is numeric (skip preloaded/pending)
-        if isinstance(orig_line, (int, float)):
+        if isinstance(orig_line, int):
             # Calculate match_end (original sequence had same length as duplicate)
-            match_end = int(orig_line) + matched_length - 1
+            match_end = orig_line + matched_length - 1
 
             # Get repeat count from the match
             repeat_count = 2  # At least 2 (original + this duplicate)
 
-            annotation_info = (dup_start, dup_end, int(orig_line), match_end, repeat_count)
+            annotation_info = (start_line, end_line, orig_line, match_end, repeat_count)
 
     # Write annotation before processing lines (if applicable)
     if annotation_info:
         write_annotation(
             output_buffer,
-            annotation_format,
-            delimiter,
+            format_annotation,
             start=annotation_info[0],
             end=annotation_info[1],
             match_start=annotation_info[2],
@@ -204,13 +187,7 @@ def handle_matched_lines(
         )
 
     # Output explain message for the entire matched sequence
-    if explain and matched_length > 0 and len(line_buffer) >= matched_length:
-        start_line = line_buffer[0].input_line_num
-        end_line = line_buffer[matched_length - 1].input_line_num
-
-        # Get original match info for explain message
-        orig_line = match.get_original_line()
-
+    if explain:
         if inverse:
             # Inverse mode: emitting duplicates
             if matched_length == 1:
@@ -225,11 +202,11 @@ def handle_matched_lines(
                         f"(duplicate in inverse mode, matched preloaded sequence)",
                         explain,
                     )
-                elif isinstance(orig_line, (int, float)):
-                    end_orig = int(orig_line) + matched_length - 1
+                elif isinstance(orig_line, int):
+                    end_orig = orig_line + matched_length - 1
                     print_explain(
                         f"Lines {start_line}-{end_line} emitted (duplicate in inverse mode, "
-                        f"matched lines {int(orig_line)}-{end_orig})",
+                        f"matched lines {orig_line}-{end_orig})",
                         explain,
                     )
                 else:
@@ -250,11 +227,11 @@ def handle_matched_lines(
                         f"(duplicate of preloaded sequence, seen 2x)",
                         explain,
                     )
-                elif isinstance(orig_line, (int, float)):
-                    end_orig = int(orig_line) + matched_length - 1
+                elif isinstance(orig_line, int):
+                    end_orig = orig_line + matched_length - 1
                     print_explain(
                         f"Lines {start_line}-{end_line} skipped "
-                        f"(duplicate of lines {int(orig_line)}-{end_orig}, seen 2x)",
+                        f"(duplicate of lines {orig_line}-{end_orig}, seen 2x)",
                         explain,
                     )
                 else:
@@ -272,8 +249,5 @@ def handle_matched_lines(
     start_tracked_line = match.tracked_line_at_start
     end_tracked_line = match.tracked_line_at_start + matched_length - 1
 
-    # Get original line for match info (needed for diverged_match_ranges)
-    orig_line_for_range = match.get_original_line()
-
     # Record this diverged match so emit_merged_lines knows to skip these lines
-    diverged_match_ranges.append((start_tracked_line, end_tracked_line, orig_line_for_range, 2))
+    diverged_match_ranges.append((start_tracked_line, end_tracked_line, orig_line, 2))
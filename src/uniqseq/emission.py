@@ -4,7 +4,7 @@ from collections import deque
 from typing import Union
 
 from .hashing import BufferedLine
-from .history import HistoryEntry
+from .history import PositionalFIFO
 from .output import print_explain
 
 
@@ -12,7 +12,7 @@ def handle_line_emission(
     buffered_line: BufferedLine,
     diverged_match_ranges: list[tuple[int, int, Union[int, float, str], int]],
     output_buffer: deque[Union[str, bytes]],
-    position_to_entry: dict[int, HistoryEntry],
+    window_hash_history: PositionalFIFO,
     inverse: bool,
     explain: bool,
 ) -> tuple[int, int]:
@@ -22,7 +22,7 @@ def handle_line_emission(
         buffered_line: The line to emit or skip
         diverged_match_ranges: Ranges of duplicate lines to skip
         output_buffer: Buffer to write output lines to
-        position_to_entry: History entries for updating output line numbers
+        window_hash_history: History whose entries get their output line numbers updated
         inverse: Whether in inverse mode
         explain: Whether to print explanations
 
@@ -55,17 +55,18 @@ def handle_line_emission(
         if inverse:
             # Inverse mode: skip unique lines
             lines_skipped_delta = 1
-            print_explain(
-                f"Line {buffered_line.input_line_num} skipped (unique in inverse mode)",
-                explain,
-            )
+            if explain:
+                print_explain(
+                    f"Line {buffered_line.input_line_num} skipped (unique in inverse mode)",
+                    explain,
+                )
         else:
             # Normal mode: emit unique lines
             output_buffer.append(buffered_line.line)
             line_num_output_delta = 1
             # Update history entry for window starting at this line
             hist_pos = buffered_line.tracked_line_num - 1
-            entry = position_to_entry.get(hist_pos)
+            entry = window_hash_history.get_entry(hist_pos)
             if entry and entry.first_output_line is None:
                 # Mark for update - caller needs to provide actual line number
                 entry.first_output_line = -1
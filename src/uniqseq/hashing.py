@@ -1,29 +1,39 @@
 """Hashing utilities for lines and windows."""
 
 import hashlib
+from collections import deque
 from dataclasses import dataclass
-from typing import Union
+from typing import Optional, Union
+
+# Window hashes are polynomial hashes of the window's line hashes modulo the Mersenne
+# prime 2**127 - 1, so a sliding window can be updated in O(1) per line instead of
+# rehashing all window_size line hashes.
+_WINDOW_HASH_MODULUS = (1 << 127) - 1
+_WINDOW_HASH_BASE = 0x5BD1E9955BD1E9952F8D3C6A7E1B4D09
+
+# Initialized line hasher; copying its state is cheaper than constructing a new hasher
+_LINE_HASHER = hashlib.blake2b(digest_size=8)
 
 
 @dataclass
 class BufferedLine:
     """A line in the buffer with its metadata."""
 
+    __slots__ = ["line", "input_line_num", "tracked_line_num"]
     line: Union[str, bytes]  # The actual line content
-    line_hash: str  # Hash of the line
     input_line_num: int  # Input line number (1-indexed, includes all lines)
     tracked_line_num: int  # Tracked line number (1-indexed, tracked lines only)
 
 
-def hash_line(line: Union[str, bytes], skip_chars: int = 0) -> str:
-    """Hash a single line to 8-byte (16 hex char) string using Blake2b.
+def hash_line(line: Union[str, bytes], skip_chars: int = 0) -> int:
+    """Hash a single line to a 64-bit integer using Blake2b.
 
     Args:
         line: The line to hash (str or bytes)
         skip_chars: Number of characters/bytes to skip from the beginning before hashing
 
     Returns:
-        16-character hex string (Blake2b 8-byte digest)
+        Blake2b 8-byte digest as an unsigned integer
     """
     # Skip prefix if requested
     content = line[skip_chars:] if skip_chars > 0 else line
@@ -34,19 +44,78 @@ def hash_line(line: Union[str, bytes], skip_chars: int = 0) -> str:
     else:
         content_bytes = content
 
-    return hashlib.blake2b(content_bytes, digest_size=8).hexdigest()
+    hasher = _LINE_HASHER.copy()
+    hasher.update(content_bytes)
+    return int.from_bytes(hasher.digest(), "big")
 
 
-def hash_window(sequence_length: int, window_hashes: list[str]) -> str:
-    """Hash a window of line hashes to 16-byte (32 hex char) string.
+def hash_window(sequence_length: int, window_hashes: list[int]) -> int:
+    """Hash a window of line hashes to a 127-bit integer.
+
+    Computes the same value that RollingWindowHash maintains incrementally.
 
     Args:
         sequence_length: Total length of the sequence (for hash uniqueness)
         window_hashes: List of line hashes in the window
 
     Returns:
-        32-character hex string (Blake2b 16-byte digest)
+        Polynomial hash of the line hashes modulo 2**127 - 1
+    """
+    # Seed with sequence length to distinguish windows of different sequence lengths
+    value = sequence_length
+    for line_hash in window_hashes:
+        value = (value * _WINDOW_HASH_BASE + line_hash) % _WINDOW_HASH_MODULUS
+    return value
+
+
+class RollingWindowHash:
+    """Hash of the most recent window_size line hashes, updated in O(1) per line.
+
+    Produces the same values as hash_window(window_size, <last window_size line hashes>).
     """
-    # Include sequence length to distinguish windows of different sequence lengths
-    combined = str(sequence_length) + ":" + "".join(window_hashes)
-    return hashlib.blake2b(combined.encode("ascii"), digest_size=16).hexdigest()
+
+    __slots__ = [
+        "window_size",
+        "_line_hashes",
+        "_value",
+        "_length_term",
+        "_oldest_factor",
+    ]
+
+    def __init__(self, window_size: int):
+        """Initialize RollingWindowHash.
+
+        Args:
+            window_size: Number of line hashes in each window
+        """
+        self.window_size = window_size
+        self._line_hashes: deque[int] = deque()  # Line hashes currently in the window
+        self._value = 0  # Polynomial over the line hashes currently in the window
+        # Contribution of the sequence_length seed that hash_window starts from
+        self._length_term = (
+            window_size * pow(_WINDOW_HASH_BASE, window_size, _WINDOW_HASH_MODULUS)
+        ) % _WINDOW_HASH_MODULUS
+        # Weight of the oldest line hash in a full window
+        self._oldest_factor = pow(_WINDOW_HASH_BASE, window_size - 1, _WINDOW_HASH_MODULUS)
+
+    def push(self, line_hash: int) -> Optional[int]:
+        """Add the next line hash, sliding the oldest one out of a full window.
+
+        Args:
+            line_hash: Hash of the next line (from hash_line)
+
+        Returns:
+            Hash of the window ending at this line, or None until window_size
+            line hashes have been pushed
+        """
+        line_hashes = self._line_hashes
+        value = self._value
+        if len(line_hashes) == self.window_size:
+            value -= line_hashes.popleft() * self._oldest_factor
+        value = (value * _WINDOW_HASH_BASE + line_hash) % _WINDOW_HASH_MODULUS
+        self._value = value
+        line_hashes.append(line_hash)
+
+        if len(line_hashes) < self.window_size:
+            return None
+        return (value + self._length_term) % _WINDOW_HASH_MODULUS
@@ -12,10 +12,9 @@ class HistoryEntry:
     Tracks where the first line of that window appeared in the output.
     """
 
-    window_hash: str  # Hash of the window
-    first_output_line: Optional[int] = (
-        None  # Output line where window's first line was emitted (None until emitted)
-    )
+    __slots__ = ["window_hash", "first_output_line"]
+    window_hash: int  # Hash of the window
+    first_output_line: Optional[int]  # Output line of window's first line (None until emitted)
 
 
 class PositionalFIFO:
@@ -29,7 +28,9 @@ class PositionalFIFO:
 
     __slots__ = [
         "maxsize",
-        "position_to_entry",
+        "_entries",
+        "_entries_base",
+        "_evicted_count",
         "key_to_positions",
         "next_position",
         "oldest_position",
@@ -42,12 +43,16 @@ class PositionalFIFO:
             maxsize: Maximum size (int) or None for unlimited
         """
         self.maxsize = maxsize
-        self.position_to_entry: dict[int, HistoryEntry] = {}  # position -> HistoryEntry
-        self.key_to_positions: dict[str, list[int]] = {}  # window_hash -> [pos1, pos2, ...]
+        # Entries for consecutive positions: position p is at index p - _entries_base.
+        # Evicted slots at the front are set to None and trimmed in bulk (see append).
+        self._entries: list[Optional[HistoryEntry]] = []
+        self._entries_base = 0
+        self._evicted_count = 0  # Evicted (None) slots at the front of _entries
+        self.key_to_positions: dict[int, list[int]] = {}  # window_hash -> [pos1, pos2, ...]
         self.next_position = 0
         self.oldest_position = 0
 
-    def append(self, key: str) -> tuple[int, Optional[tuple[str, int]]]:
+    def append(self, key: int) -> tuple[int, Optional[tuple[int, int]]]:
         """Add key, return position and evicted entry info.
 
         Returns:
@@ -55,25 +60,36 @@ class PositionalFIFO:
             or (evicted_key, evicted_position) if an entry was evicted.
         """
         position = self.next_position
-        evicted_info: Optional[tuple[str, int]] = None
+        evicted_info: Optional[tuple[int, int]] = None
 
         # Evict oldest if at capacity (skip if unlimited)
-        if self.maxsize is not None and len(self.position_to_entry) >= self.maxsize:
-            old_entry = self.position_to_entry[self.oldest_position]
+        entries = self._entries
+        if self.maxsize is not None and len(entries) - self._evicted_count >= self.maxsize:
+            old_entry = entries[self._evicted_count]
+            assert old_entry is not None
             old_key = old_entry.window_hash
             evicted_position = self.oldest_position
 
-            self.key_to_positions[old_key].remove(self.oldest_position)
-            if not self.key_to_positions[old_key]:
+            # Positions are appended in increasing order, so the oldest position
+            # is always first in its key's list
+            old_key_positions = self.key_to_positions[old_key]
+            del old_key_positions[0]
+            if not old_key_positions:
                 del self.key_to_positions[old_key]
-            del self.position_to_entry[self.oldest_position]
+            entries[self._evicted_count] = None
+            self._evicted_count += 1
             self.oldest_position += 1
 
+            # Trim evicted slots once they make up half the list (amortized O(1))
+            if self._evicted_count * 2 >= len(entries):
+                del entries[: self._evicted_count]
+                self._entries_base += self._evicted_count
+                self._evicted_count = 0
+
             evicted_info = (old_key, evicted_position)
 
         # Add new entry (first_output_line will be set later when first line is emitted)
-        entry = HistoryEntry(window_hash=key, first_output_line=None)
-        self.position_to_entry[position] = entry
+        entries.append(HistoryEntry(window_hash=key, first_output_line=None))
         if key not in self.key_to_positions:
             self.key_to_positions[key] = []
         self.key_to_positions[key].append(position)
@@ -81,19 +97,26 @@ class PositionalFIFO:
 
         return position, evicted_info
 
-    def find_all_positions(self, key: str) -> list[int]:
+    def find_all_positions(self, key: int) -> list[int]:
         """Get all positions with this key."""
         result = self.key_to_positions.get(key, [])
         return list(result)  # Return copy to avoid mutation issues
 
-    def get_key(self, position: int) -> Optional[str]:
+    def get_key(self, position: int) -> Optional[int]:
         """Get window hash at position."""
-        entry = self.position_to_entry.get(position)
-        return entry.window_hash if entry else None
+        index = position - self._entries_base
+        if 0 <= index < len(self._entries):
+            entry = self._entries[index]
+            if entry is not None:
+                return entry.window_hash
+        return None
 
     def get_entry(self, position: int) -> Optional[HistoryEntry]:
         """Get history entry at position."""
-        return self.position_to_entry.get(position)
+        index = position - self._entries_base
+        if 0 <= index < len(self._entries):
+            return self._entries[index]
+        return None
 
     def get_next_position(self, position: int) -> int:
         """Get next position (position + 1).
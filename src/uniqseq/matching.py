@@ -1,10 +1,14 @@
 """Sequence matching and active match management."""
 
-import math
-from collections.abc import Callable, Iterator
-from typing import Optional, Union, cast
+from bisect import bisect_right
+from collections.abc import Callable, Iterator, Sequence
+from typing import Optional, Union
 
-from .recording import RecordedSequence
+from .history import PositionalFIFO
+from .recording import HistorySequence, RecordedSequence
+
+# Shared stand-in for a window hash with no history positions (avoids allocating per line)
+_NO_HISTORY_POSITIONS: tuple[int, ...] = ()
 
 
 class ActiveMatchManager:
@@ -14,6 +18,8 @@ class ActiveMatchManager:
     Prioritizes recorded sequence matches over history matches.
     """
 
+    __slots__ = ["max_candidates", "_matches", "_alignments"]
+
     def __init__(self, max_candidates: Optional[int] = None):
         """Initialize the manager.
 
@@ -22,6 +28,8 @@ class ActiveMatchManager:
         """
         self.max_candidates = max_candidates
         self._matches: set[SubsequenceMatch] = set()
+        # Alignment keys of the active matches (see SubsequenceMatch.alignment_key)
+        self._alignments: set[tuple[RecordedSequence, int]] = set()
 
     def try_add(self, match: "SubsequenceMatch") -> bool:
         """Try to add a match, respecting max_candidates limit.
@@ -37,6 +45,7 @@ class ActiveMatchManager:
             return False
 
         self._matches.add(match)
+        self._alignments.add(match.alignment_key)
         return True
 
     def discard(self, match: "SubsequenceMatch") -> None:
@@ -45,11 +54,25 @@ class ActiveMatchManager:
         Args:
             match: The match to remove
         """
-        self._matches.discard(match)
+        if match in self._matches:
+            self._matches.remove(match)
+            self._alignments.discard(match.alignment_key)
 
     def clear(self) -> None:
         """Remove all matches."""
         self._matches.clear()
+        self._alignments.clear()
+
+    def has_alignment(self, alignment_key: tuple[RecordedSequence, int]) -> bool:
+        """Check if an active match already follows a sequence at a given alignment.
+
+        Args:
+            alignment_key: (sequence, window index minus tracked window start) pair
+
+        Returns:
+            True if an active match has this alignment key
+        """
+        return alignment_key in self._alignments
 
     def __iter__(self) -> Iterator["SubsequenceMatch"]:
         """Iterate over active matches."""
@@ -70,11 +93,21 @@ class SubsequenceMatch:
     Not to be instantiated. Use subclasses.
     """
 
+    __slots__ = [
+        "output_cursor_at_start",
+        "tracked_line_at_start",
+        "next_window_index",
+        "alignment_key",
+    ]
+
     output_cursor_at_start: Union[int, float]  # Output cursor when match started
     tracked_line_at_start: int  # Tracked input line number when match started
-    next_window_index: int = 1  # Which window to check next
+    next_window_index: int  # Which window to check next
+    # (sequence, window index - tracked window start): constant while the match
+    # advances one window per input window, so it identifies the match's position
+    alignment_key: tuple[RecordedSequence, int]
 
-    def get_window_hash(self, offset_from_match_start: int) -> Optional[str]:
+    def get_window_hash(self, offset_from_match_start: int) -> Optional[int]:
         raise NotImplementedError("Use subclass")
 
     def record_match(
@@ -85,16 +118,22 @@ class SubsequenceMatch:
     ) -> None:
         raise NotImplementedError("Use subclass")
 
-    def get_original_line(self) -> Union[int, float, str]:
+    def get_original_line(self) -> Union[int, str]:
         """Get the original line number or identifier for this match.
 
         Returns:
-            Line number, float (for special cases like preloaded), or string identifier
+            Line number, or string identifier ("preloaded" or "pending")
         """
         raise NotImplementedError("Use subclass")
 
 
 class RecordedSubsequenceMatch(SubsequenceMatch):
+    __slots__ = [
+        "_recorded_sequence",
+        "_delimiter",
+        "_match_start_window_offset",
+    ]
+
     def __init__(
         self,
         output_cursor_at_start: Union[int, float],
@@ -109,8 +148,12 @@ class RecordedSubsequenceMatch(SubsequenceMatch):
         self._recorded_sequence: RecordedSequence = recorded_sequence
         self._delimiter = delimiter
         self._match_start_window_offset: int = match_start_window_offset_in_recorded_sequence
+        self.alignment_key = (
+            recorded_sequence,
+            match_start_window_offset_in_recorded_sequence - tracked_line_at_start,
+        )
 
-    def get_window_hash(self, offset_from_match_start: int) -> Optional[str]:
+    def get_window_hash(self, offset_from_match_start: int) -> Optional[int]:
         # Offset from match start + where match started in sequence = actual window position
         return self._recorded_sequence.get_window_hash(
             self._match_start_window_offset + offset_from_match_start
@@ -132,7 +175,7 @@ class RecordedSubsequenceMatch(SubsequenceMatch):
             delimiter=self._delimiter,
         )
 
-    def get_original_line(self) -> Union[int, float, str]:
+    def get_original_line(self) -> Union[int, str]:
         """Get the original line number or identifier for this match.
 
         Returns the output line number where this match started, accounting for where
@@ -142,7 +185,7 @@ class RecordedSubsequenceMatch(SubsequenceMatch):
 
 
 def update_active_matches(
-    active_matches: ActiveMatchManager, current_window_hash: str
+    active_matches: ActiveMatchManager, current_window_hash: int
 ) -> list[SubsequenceMatch]:
     """Update all active matches with current window hash.
 
@@ -155,76 +198,141 @@ def update_active_matches(
     """
     diverged = []
 
-    for match in list(active_matches):
+    # Iterate the live set without copying it; diverged matches are removed afterwards
+    for match in active_matches:
         # All active matches are SubsequenceMatch (polymorphic subclasses)
         expected = match.get_window_hash(match.next_window_index)
 
         if expected is None or current_window_hash != expected:
             # Diverged or reached end
             diverged.append(match)
-            active_matches.discard(match)
         else:
             # Continue matching
             match.next_window_index += 1
 
+    for match in diverged:
+        active_matches.discard(match)
+
     return diverged
 
 
 def check_for_new_matches(
-    current_window_hash: str,
-    sequence_window_index: dict[str, list[tuple[RecordedSequence, int]]],
+    current_window_hash: int,
+    sequence_window_index: dict[int, list[tuple[RecordedSequence, int]]],
+    window_hash_history: PositionalFIFO,
+    history_sequence: HistorySequence,
     active_matches: ActiveMatchManager,
     line_num_input_tracked: int,
     line_num_output: int,
     window_size: int,
     delimiter: Union[str, bytes],
 ) -> None:
-    """Check for new matches against all windows in all known sequences.
+    """Check for new matches against all windows in all known sequences and in history.
 
     Args:
         current_window_hash: Hash of current window
         sequence_window_index: Index mapping window hashes to (sequence, window_index) pairs
+            for recorded sequences
+        window_hash_history: FIFO history of window hashes
+        history_sequence: Virtual sequence representing history
         active_matches: Manager for active matches
         line_num_input_tracked: Current tracked input line number
         line_num_output: Current output line number
         window_size: Window size for deduplication
         delimiter: Delimiter being used
     """
-    if current_window_hash not in sequence_window_index:
-        return
-
+    # Most streams record no sequences for a long time (or ever): skip the probe then
+    recorded_windows = (
+        sequence_window_index.get(current_window_hash) if sequence_window_index else None
+    )
+    history_positions: Sequence[int] = window_hash_history.key_to_positions.get(
+        current_window_hash, _NO_HISTORY_POSITIONS
+    )
     current_window_start = line_num_input_tracked - window_size + 1
 
-    # Collect currently active (sequence, window_index) pairs to avoid redundant matches
-    # All active matches are now RecordedSubsequenceMatch
-    active_sequence_positions = {
-        (
-            cast(RecordedSubsequenceMatch, m)._recorded_sequence,
-            cast(RecordedSubsequenceMatch, m)._match_start_window_offset
-            + (m.next_window_index - 1),
-        )
-        for m in active_matches
-    }
-
-    for seq, window_index in sequence_window_index[current_window_hash]:
-        # Get sequence position using polymorphic method
-        seq_position = seq.get_sequence_position(window_index, window_size)
-
-        # Skip if overlapping with current window
-        if math.isfinite(seq_position) and seq_position + window_size > current_window_start:
-            continue
-
-        # Skip if we already have an active match at this exact (sequence, position)
-        if (seq, window_index) in active_sequence_positions:
-            continue
-
-        # Create RecordedSubsequenceMatch to track this match
-        match = RecordedSubsequenceMatch(
-            output_cursor_at_start=line_num_output,
-            tracked_line_at_start=current_window_start,
-            recorded_sequence=seq,
-            delimiter=delimiter,
-            match_start_window_offset_in_recorded_sequence=window_index,
+    # History position p holds the window starting at tracked line p + 1, so it
+    # overlaps the current window when p + 1 + window_size > current_window_start.
+    # Positions are appended in increasing order, so the non-overlapping ones
+    # form a prefix that bisect finds without scanning the whole list.
+    non_overlapping_end = bisect_right(history_positions, current_window_start - window_size - 1)
+    if not recorded_windows and not non_overlapping_end:
+        return
+
+    # Start matches in the order their windows were indexed (this decides which
+    # matches win when max_candidates is reached): history windows added before a
+    # sequence was recorded come before that sequence's windows.
+    history_index = 0
+    if recorded_windows:
+        for seq, window_index in recorded_windows:
+            # Get sequence position using polymorphic method
+            seq_position = seq.get_sequence_position(window_index, window_size)
+
+            # Skip if overlapping with current window
+            if seq_position is not None and seq_position + window_size > current_window_start:
+                continue
+
+            while (
+                history_index < non_overlapping_end
+                and history_positions[history_index] < seq.indexed_at_history_position
+            ):
+                _start_match(
+                    history_sequence,
+                    history_positions[history_index],
+                    active_matches,
+                    line_num_output,
+                    current_window_start,
+                    delimiter,
+                )
+                history_index += 1
+            _start_match(
+                seq,
+                window_index,
+                active_matches,
+                line_num_output,
+                current_window_start,
+                delimiter,
+            )
+
+    for remaining_index in range(history_index, non_overlapping_end):
+        _start_match(
+            history_sequence,
+            history_positions[remaining_index],
+            active_matches,
+            line_num_output,
+            current_window_start,
+            delimiter,
         )
-        # Try to add match (respects max_candidates limit)
-        active_matches.try_add(match)
+
+
+def _start_match(
+    seq: RecordedSequence,
+    window_index: int,
+    active_matches: ActiveMatchManager,
+    line_num_output: int,
+    current_window_start: int,
+    delimiter: Union[str, bytes],
+) -> None:
+    """Start tracking a match at a window of a sequence, unless one is already active there.
+
+    Args:
+        seq: Sequence containing the matching window
+        window_index: Index of the matching window within the sequence
+        active_matches: Manager for active matches
+        line_num_output: Current output line number
+        current_window_start: Tracked input line number where the current window starts
+        delimiter: Delimiter being used
+    """
+    # Skip if we already have an active match at this exact (sequence, position)
+    if active_matches.has_alignment((seq, window_index - current_window_start)):
+        return
+
+    # Create RecordedSubsequenceMatch to track this match
+    match = RecordedSubsequenceMatch(
+        output_cursor_at_start=line_num_output,
+        tracked_line_at_start=current_window_start,
+        recorded_sequence=seq,
+        delimiter=delimiter,
+        match_start_window_offset_in_recorded_sequence=window_index,
+    )
+    # Try to add match (respects max_candidates limit)
+    active_matches.try_add(match)
@@ -1,8 +1,11 @@
 """Output formatting including annotations and explanations."""
 
+import string
 import sys
 from collections import deque
-from typing import Union
+from collections.abc import Callable
+from functools import cache
+from typing import Optional, Union
 
 
 def print_explain(message: str, explain: bool) -> None:
@@ -16,10 +19,103 @@ def print_explain(message: str, explain: bool) -> None:
         print(f"EXPLAIN: {message}", file=sys.stderr)
 
 
+def _parse_plain_annotation_format(
+    annotation_format: str,
+) -> Optional[list[tuple[str, Optional[str]]]]:
+    """Split an annotation template into literal text and plain ``{name}`` fields.
+
+    Args:
+        annotation_format: Template string using ``str.format`` syntax
+
+    Returns:
+        List of (literal_text, field_name) pairs (field_name is None after the final
+        literal), or None if the template uses format specs, conversions, or
+        non-identifier fields
+    """
+    parts = []
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(annotation_format):
+        if field_name is not None and (not field_name.isidentifier() or format_spec or conversion):
+            return None
+        parts.append((literal, field_name))
+    return parts
+
+
+@cache
+def compile_annotation_format(annotation_format: str) -> Callable[[dict[str, int]], str]:
+    """Parse an annotation template once into a reusable formatter.
+
+    Templates that only use plain ``{name}`` fields are compiled to an equivalent
+    printf-style template, so the ``str.format`` syntax is not re-parsed for every
+    annotation. Templates with format specs or conversions fall back to ``format_map``.
+
+    Args:
+        annotation_format: Template string using ``str.format`` syntax
+
+    Returns:
+        Callable taking a mapping of template variables and returning the annotation.
+        Unknown variables raise KeyError when the formatter is called.
+    """
+    parts = _parse_plain_annotation_format(annotation_format)
+    if parts is None:
+        return annotation_format.format_map
+    template = "".join(
+        literal.replace("%", "%%") + (f"%({field_name})s" if field_name is not None else "")
+        for literal, field_name in parts
+    )
+    return template.__mod__
+
+
+@cache
+def compile_binary_annotation_format(
+    annotation_format: str,
+) -> Callable[[dict[str, int]], bytes]:
+    """Parse an annotation template once into a reusable formatter producing UTF-8 bytes.
+
+    The literal parts of plain ``{name}`` templates are encoded once, up front, and
+    the integer fields are substituted directly into the encoded template.
+
+    Args:
+        annotation_format: Template string using ``str.format`` syntax
+
+    Returns:
+        Callable taking a mapping of integer template variables and returning the
+        encoded annotation. Unknown variables raise KeyError when the formatter is called.
+    """
+    parts = _parse_plain_annotation_format(annotation_format)
+    if parts is None:
+        return lambda fields: annotation_format.format_map(fields).encode("utf-8")
+    template = b"".join(
+        literal.replace("%", "%%").encode("utf-8") + (b"%d" if field_name is not None else b"")
+        for literal, field_name in parts
+    )
+    field_names = tuple(field_name for _, field_name in parts if field_name is not None)
+    return lambda fields: template % tuple([fields[name] for name in field_names])
+
+
+def bind_annotation_format(
+    annotation_format: str, delimiter: Union[str, bytes]
+) -> Callable[[dict[str, int]], Union[str, bytes]]:
+    """Bind an annotation template to the output mode.
+
+    The mode is fixed for the lifetime of a deduplicator, so the str/bytes decision
+    is made here once instead of for every annotation.
+
+    Args:
+        annotation_format: Template string using ``str.format`` syntax
+        delimiter: Delimiter being used (str for text mode, bytes for binary mode)
+
+    Returns:
+        Callable taking a mapping of template variables and returning the annotation
+        as str in text mode or UTF-8 encoded bytes in binary mode
+    """
+    if isinstance(delimiter, bytes):
+        return compile_binary_annotation_format(annotation_format)
+    return compile_annotation_format(annotation_format)
+
+
 def write_annotation(
     output_buffer: deque[Union[str, bytes]],
-    annotation_format: str,
-    delimiter: Union[str, bytes],
+    format_annotation: Callable[[dict[str, int]], Union[str, bytes]],
     start: int,
     end: int,
     match_start: int,
@@ -31,8 +127,7 @@ def write_annotation(
 
     Args:
         output_buffer: The output buffer to write to
-        annotation_format: Template string for annotation
-        delimiter: Delimiter being used (str or bytes)
+        format_annotation: Annotation formatter from bind_annotation_format
         start: First line number of skipped sequence
         end: Last line number of skipped sequence
         match_start: First line number of matched sequence
@@ -40,19 +135,16 @@ def write_annotation(
         count: Total times sequence has been seen
         window_size: Window size for deduplication
     """
-    # Substitute template variables
-    annotation = annotation_format.format(
-        start=start,
-        end=end,
-        match_start=match_start,
-        match_end=match_end,
-        count=count,
-        window_size=window_size,
+    # Substitute template variables (already encoded to bytes in binary mode)
+    output_buffer.append(
+        format_annotation(
+            {
+                "start": start,
+                "end": end,
+                "match_start": match_start,
+                "match_end": match_end,
+                "count": count,
+                "window_size": window_size,
+            }
+        )
     )
-
-    # Add annotation to output buffer
-    # Convert to bytes if in binary mode
-    if isinstance(delimiter, bytes):
-        output_buffer.append(annotation.encode("utf-8"))
-    else:
-        output_buffer.append(annotation)
@@ -2,14 +2,14 @@
 
 from typing import Union
 
-from .hashing import hash_line, hash_window
+from .hashing import RollingWindowHash, hash_line
 from .recording import PRELOADED_SEQUENCE_LINE, RecordedSequence, SequenceRegistry
 
 
 def initialize_preloaded_sequences(
     preloaded_sequences: set[Union[str, bytes]],
     sequence_records: SequenceRegistry,
-    sequence_window_index: dict[str, list[tuple[RecordedSequence, int]]],
+    sequence_window_index: dict[int, list[tuple[RecordedSequence, int]]],
     delimiter: Union[str, bytes],
     window_size: int,
 ) -> None:
@@ -44,14 +44,14 @@ def initialize_preloaded_sequences(
         if sequence_length < window_size:
             continue
 
-        # Compute line hashes (lines don't have delimiters, matching process_line)
-        line_hashes = [hash_line(line) for line in lines_without_delim]
-
-        # Compute all window hashes for this sequence
+        # Compute all window hashes for this sequence in one rolling pass
+        # (lines don't have delimiters, matching process_line)
+        push = RollingWindowHash(window_size).push
         seq_window_hashes = []
-        for i in range(sequence_length - window_size + 1):
-            window_hash = hash_window(window_size, line_hashes[i : i + window_size])
-            seq_window_hashes.append(window_hash)
+        for line_hash in map(hash_line, lines_without_delim):
+            window_hash = push(line_hash)
+            if window_hash is not None:
+                seq_window_hashes.append(window_hash)
 
         sequence_data.append(tuple(seq_window_hashes))
 
@@ -60,7 +60,7 @@ def initialize_preloaded_sequences(
 
     # Third pass: create RecordedSequence objects and add to data structures
     for window_hashes_tuple in deduplicated:
-        window_hashes: list[str] = list(window_hashes_tuple)
+        window_hashes: list[int] = list(window_hashes_tuple)
         # Create RecordedSequence object with PRELOADED_SEQUENCE_LINE as first_output_line
         seq_rec = RecordedSequence(
             first_output_line=PRELOADED_SEQUENCE_LINE,
@@ -76,8 +76,8 @@ def initialize_preloaded_sequences(
 
 
 def deduplicate_nested_sequences(
-    sequences: list[tuple[str, ...]],
-) -> list[tuple[str, ...]]:
+    sequences: list[tuple[int, ...]],
+) -> list[tuple[int, ...]]:
     """Remove sequences fully nested in longer sequences, and deduplicate identical.
 
     Args:
@@ -120,7 +120,7 @@ def deduplicate_nested_sequences(
     return [sequences[i] for i in sorted(to_keep)]
 
 
-def is_nested_in(needle: tuple[str, ...], haystack: tuple[str, ...]) -> bool:
+def is_nested_in(needle: tuple[int, ...], haystack: tuple[int, ...]) -> bool:
     """Check if needle sequence appears as a contiguous subsequence in haystack.
 
     Args:
@@ -146,7 +146,7 @@ def is_nested_in(needle: tuple[str, ...], haystack: tuple[str, ...]) -> bool:
 
 def index_sequence_windows(
     sequence: RecordedSequence,
-    sequence_window_index: dict[str, list[tuple[RecordedSequence, int]]],
+    sequence_window_index: dict[int, list[tuple[RecordedSequence, int]]],
 ) -> None:
     """Add all windows of a sequence to the window index.
 
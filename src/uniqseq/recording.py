@@ -7,7 +7,8 @@ from typing import Optional, Union
 from .history import PositionalFIFO
 
 # Sentinel value for preloaded sequences that were never observed in output
-PRELOADED_SEQUENCE_LINE = float("-inf")
+# (an int far below any real output line, so first_output_line stays an int)
+PRELOADED_SEQUENCE_LINE = -1_000_000_000
 
 # Sentinel value for sequences whose first occurrence was never output (e.g., in inverse mode)
 # Use a distinct large negative number (not -inf, since -inf - 1 == -inf)
@@ -21,6 +22,8 @@ class SequenceRegistry:
     Preloaded sequences are never evicted.
     """
 
+    __slots__ = ["max_sequences", "_sequences", "_evictable_count", "_by_first_hash"]
+
     def __init__(self, max_sequences: Optional[int] = None):
         """Initialize the registry.
 
@@ -30,8 +33,10 @@ class SequenceRegistry:
         self.max_sequences = max_sequences
         # OrderedDict for LRU tracking: RecordedSequence -> None
         self._sequences: OrderedDict[RecordedSequence, None] = OrderedDict()
+        # Number of non-preloaded (evictable) sequences in _sequences
+        self._evictable_count = 0
         # Fast lookup by first hash: first_hash -> list of sequences
-        self._by_first_hash: dict[str, list[RecordedSequence]] = {}
+        self._by_first_hash: dict[int, list[RecordedSequence]] = {}
 
     def add(self, sequence: "RecordedSequence") -> None:
         """Add a sequence to the registry with LRU eviction if needed.
@@ -41,48 +46,43 @@ class SequenceRegistry:
         """
         is_preloaded = sequence.first_output_line == PRELOADED_SEQUENCE_LINE
 
-        # Check if we need to evict (count only non-preloaded sequences)
         if self.max_sequences is not None and not is_preloaded:
-            # Count non-preloaded sequences
-            non_preloaded_count = sum(
-                1 for seq in self._sequences if seq.first_output_line != PRELOADED_SEQUENCE_LINE
-            )
-
             # If max is 0, don't add any non-preloaded sequences
             if self.max_sequences == 0:
                 return
 
-            while non_preloaded_count >= self.max_sequences:
-                # Evict least recently used non-preloaded sequence
-                evicted = False
-                for seq in list(self._sequences.keys()):
-                    if seq.first_output_line != PRELOADED_SEQUENCE_LINE:
-                        # Found a non-preloaded sequence to evict
-                        del self._sequences[seq]
-                        # Remove from first_hash index
-                        first_hash = seq.get_window_hash(0)
-                        if first_hash and first_hash in self._by_first_hash:
-                            self._by_first_hash[first_hash].remove(seq)
-                            if not self._by_first_hash[first_hash]:
-                                del self._by_first_hash[first_hash]
-                        evicted = True
-                        non_preloaded_count -= 1
-                        break
-
-                if not evicted:
-                    # All sequences are preloaded, can't evict
-                    break
+            while self._evictable_count >= self.max_sequences:
+                self._evict_oldest()
 
         # Add to LRU tracker
+        if not is_preloaded and sequence not in self._sequences:
+            self._evictable_count += 1
         self._sequences[sequence] = None
 
         # Add to first_hash index
         first_hash = sequence.get_window_hash(0)
-        if first_hash:
+        if first_hash is not None:
             if first_hash not in self._by_first_hash:
                 self._by_first_hash[first_hash] = []
             self._by_first_hash[first_hash].append(sequence)
 
+    def _evict_oldest(self) -> None:
+        """Evict the least recently used non-preloaded sequence."""
+        # Iterate the live view: we stop at the first deletion, so no copy is needed
+        for seq in self._sequences:
+            if seq.first_output_line != PRELOADED_SEQUENCE_LINE:
+                break
+        else:
+            return
+        del self._sequences[seq]
+        self._evictable_count -= 1
+        # Remove from first_hash index
+        first_hash = seq.get_window_hash(0)
+        if first_hash is not None and first_hash in self._by_first_hash:
+            self._by_first_hash[first_hash].remove(seq)
+            if not self._by_first_hash[first_hash]:
+                del self._by_first_hash[first_hash]
+
     def mark_accessed(self, sequence: "RecordedSequence") -> None:
         """Mark a sequence as recently accessed (move to end of LRU).
 
@@ -92,7 +92,7 @@ class SequenceRegistry:
         if sequence in self._sequences:
             self._sequences.move_to_end(sequence)
 
-    def get_by_first_hash(self, first_hash: str) -> "list[RecordedSequence]":
+    def get_by_first_hash(self, first_hash: int) -> "list[RecordedSequence]":
         """Get all sequences with a given first window hash.
 
         Args:
@@ -122,27 +122,37 @@ class RecordedSequence:
     All data beyond KnownSequence interface is private.
     """
 
+    __slots__ = [
+        "first_output_line",
+        "_window_hashes",
+        "indexed_at_history_position",
+        "subsequence_match_counts",
+    ]
+
     def __init__(
         self,
-        first_output_line: Union[int, float],
-        window_hashes: list[str],
+        first_output_line: int,
+        window_hashes: list[int],
         counts: Optional[dict[tuple[int, int], int]],
+        indexed_at_history_position: int = 0,
     ):
         self.first_output_line = first_output_line
         self._window_hashes = window_hashes
+        # Next history position when this sequence's windows were indexed
+        # (orders new matches against this sequence relative to history matches)
+        self.indexed_at_history_position = indexed_at_history_position
         # Maps (start_window_offset, end_window_offset) -> count of matches for that subsequence
-        self.subsequence_match_counts: Counter[tuple[int, int]] = Counter()
-        if counts:
-            for key, count in counts.items():
-                self.subsequence_match_counts[key] = count
+        self.subsequence_match_counts: Counter[tuple[int, int]] = (
+            Counter(counts) if counts else Counter()
+        )
 
-    def get_window_hash(self, window_index_in_recorded_sequence: int) -> Optional[str]:
+    def get_window_hash(self, window_index_in_recorded_sequence: int) -> Optional[int]:
         """Lookup window hash at index in this recorded sequence."""
         if 0 <= window_index_in_recorded_sequence < len(self._window_hashes):
             return self._window_hashes[window_index_in_recorded_sequence]
         return None
 
-    def get_sequence_position(self, window_index: int, window_size: int) -> Union[int, float]:
+    def get_sequence_position(self, window_index: int, window_size: int) -> Optional[int]:
         """Get the position of a window within this sequence for overlap checking.
 
         Args:
@@ -150,30 +160,26 @@ class RecordedSequence:
             window_size: Size of the window
 
         Returns:
-            Position value for overlap checking
+            Position value for overlap checking, or None for preloaded sequences
+            (which have no position and never overlap)
         """
-        import math
-
-        if not math.isfinite(self.first_output_line):
-            # Preloaded sequence without position - return -inf to allow matching
-            return -float("inf")
+        if self.first_output_line == PRELOADED_SEQUENCE_LINE:
+            return None
         # Position is first_output_line offset by window_index
-        return int(self.first_output_line) + window_index
+        return self.first_output_line + window_index
 
-    def get_output_line_for_window(self, window_index: int) -> Union[int, float, str]:
+    def get_output_line_for_window(self, window_index: int) -> Union[int, str]:
         """Get the output line number where a window was first emitted.
 
         Args:
             window_index: Index of the window within this sequence
 
         Returns:
-            Output line number (1-indexed), float for special cases, or "preloaded"
+            Output line number (1-indexed), or "preloaded"
         """
-        import math
-
-        if not math.isfinite(self.first_output_line):
+        if self.first_output_line == PRELOADED_SEQUENCE_LINE:
             return "preloaded"
-        return int(self.first_output_line) + window_index
+        return self.first_output_line + window_index
 
     def record_match(
         self,
@@ -214,11 +220,20 @@ class HistorySequence(RecordedSequence):
     allowing history to be treated uniformly with other recorded sequences.
     """
 
+    __slots__ = [
+        "_history",
+        "_sequence_records",
+        "_sequence_window_index",
+        "_delimiter",
+        "_window_size",
+        "current_input_position",
+    ]
+
     def __init__(
         self,
         history: PositionalFIFO,
         sequence_records: SequenceRegistry,
-        sequence_window_index: dict[str, list[tuple[RecordedSequence, int]]],
+        sequence_window_index: dict[int, list[tuple[RecordedSequence, int]]],
         delimiter: Union[str, bytes],
         window_size: int,
     ):
@@ -233,7 +248,7 @@ class HistorySequence(RecordedSequence):
         self.current_input_position: Optional[int] = None
         # No window_hashes or match_counts - history manages this differently
 
-    def get_window_hash(self, history_fifo_position: int) -> Optional[str]:
+    def get_window_hash(self, history_fifo_position: int) -> Optional[int]:
         """Lookup window hash at history position.
 
         Returns None if the requested position overlaps with current input window.
@@ -251,7 +266,7 @@ class HistorySequence(RecordedSequence):
 
         return self._history.get_key(history_fifo_position)
 
-    def get_sequence_position(self, window_index: int, window_size: int) -> Union[int, float]:
+    def get_sequence_position(self, window_index: int, window_size: int) -> Optional[int]:
         """Get the position of a window within history for overlap checking.
 
         History position `window_index` was added at tracked line `window_index + 1`.
@@ -259,7 +274,7 @@ class HistorySequence(RecordedSequence):
         """
         return window_index + 1
 
-    def get_output_line_for_window(self, window_index: int) -> Union[int, float, str]:
+    def get_output_line_for_window(self, window_index: int) -> Union[int, str]:
         """Get the output line number where a history window was first emitted.
 
         Args:
@@ -295,13 +310,18 @@ class HistorySequence(RecordedSequence):
         # Use instance delimiter if not provided
         if delimiter is None:
             delimiter = self._delimiter
-        # Collect window hashes from history
+        # Collect window hashes from history, stopping at the first window that
+        # overlaps the current input (see get_window_hash) or is no longer in history
+        end_position = match_start_position_in_history + number_of_windows_matched
+        if self.current_input_position is not None:
+            end_position = min(end_position, self.current_input_position - self._window_size)
+        get_entry = self._history.get_entry
         window_hashes = []
-        for i in range(number_of_windows_matched):
-            h = self.get_window_hash(match_start_position_in_history + i)
-            if h is None:
+        for position in range(match_start_position_in_history, end_position):
+            entry = get_entry(position)
+            if entry is None:
                 break
-            window_hashes.append(h)
+            window_hashes.append(entry.window_hash)
 
         if not window_hashes:
             return
@@ -319,6 +339,7 @@ class HistorySequence(RecordedSequence):
             first_output_line=first_output_line,
             window_hashes=window_hashes,
             counts=None,
+            indexed_at_history_position=self._history.next_position,
         )
 
         # Add to sequence registry
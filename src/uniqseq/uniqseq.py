@@ -9,17 +9,16 @@ from .buffering import calculate_min_buffer_depth
 from .divergence import handle_diverged_matches
 from .emission import handle_line_emission
 from .filtering import FilterPattern, evaluate_filter, get_bypass_description
-from .hashing import BufferedLine
+from .hashing import BufferedLine, RollingWindowHash
 from .history import PositionalFIFO
-from .indexing import add_to_history_and_index
 from .matching import (
     ActiveMatchManager,
     check_for_new_matches,
     update_active_matches,
 )
-from .output import print_explain
+from .output import bind_annotation_format, print_explain
 from .preloading import initialize_preloaded_sequences
-from .processing import calculate_window_hash, prepare_line_for_deduplication
+from .processing import prepare_line_for_deduplication
 from .recording import (
     HistorySequence,
     RecordedSequence,
@@ -119,6 +118,7 @@ class UniqSeq:
             "[DUPLICATE: Lines {start}-{end} matched lines "
             "{match_start}-{match_end} (sequence seen {count} times)]"
         )
+        self._format_annotation = bind_annotation_format(self.annotation_format, delimiter)
         self.explain = explain  # Show explanations to stderr
 
         # Positional FIFO for window hash history (tracks window hashes and output line numbers)
@@ -127,9 +127,10 @@ class UniqSeq:
         # Unique sequences (LRU-evicted at max_unique_sequences)
         self.sequence_records = SequenceRegistry(max_sequences=max_unique_sequences)
 
-        # Window index: maps every window hash in every sequence to (sequence, window_index)
-        # This allows matching against any subsequence within a known sequence
-        self.sequence_window_index: dict[str, list[tuple[RecordedSequence, int]]] = defaultdict(
+        # Window index: maps every window hash in every recorded sequence to
+        # (sequence, window_index). This allows matching against any subsequence within
+        # a known sequence. History windows are looked up in window_hash_history instead.
+        self.sequence_window_index: dict[int, list[tuple[RecordedSequence, int]]] = defaultdict(
             list
         )
 
@@ -162,6 +163,9 @@ class UniqSeq:
         # Line buffer (grows beyond window_size to accommodate active matches)
         self.line_buffer: deque[BufferedLine] = deque()
 
+        # Hash of the most recent window_size tracked lines, updated as each line arrives
+        self._window_hasher = RollingWindowHash(window_size)
+
         # Filtered lines buffer (separate from deduplication pipeline)
         # Stores (input_line_num, line) tuples for lines that bypass deduplication
         self.filtered_lines: deque[tuple[int, Union[str, bytes]]] = deque()
@@ -237,14 +241,7 @@ class UniqSeq:
         self._process_line_internal(line, progress_callback)
 
         # Write buffer contents to stream
-        while self._output_buffer:
-            output_line = self._output_buffer.popleft()
-            if isinstance(output_line, bytes):
-                assert isinstance(self.delimiter, bytes), "Delimiter must be bytes in binary mode"
-                output.write(output_line + self.delimiter)  # type: ignore
-            else:
-                assert isinstance(self.delimiter, str), "Delimiter must be str in text mode"
-                output.write(output_line + self.delimiter)  # type: ignore
+        self._write_output_buffer(output)
 
     def flush_to_stream(self, output: Union[TextIO, "BinaryIO"] = sys.stdout) -> None:
         """
@@ -259,14 +256,22 @@ class UniqSeq:
         self.flush()
 
         # Write buffer contents to stream
-        while self._output_buffer:
-            output_line = self._output_buffer.popleft()
-            if isinstance(output_line, bytes):
-                assert isinstance(self.delimiter, bytes), "Delimiter must be bytes in binary mode"
-                output.write(output_line + self.delimiter)  # type: ignore
-            else:
-                assert isinstance(self.delimiter, str), "Delimiter must be str in text mode"
-                output.write(output_line + self.delimiter)  # type: ignore
+        self._write_output_buffer(output)
+
+    def _write_output_buffer(self, output: Union[TextIO, "BinaryIO"]) -> None:
+        """Drain the output buffer to a stream, appending the delimiter to each line.
+
+        Buffered lines always have the same type as the delimiter (str in text mode,
+        bytes in binary mode), so lines are written without per-line type checks.
+
+        Args:
+            output: Output stream
+        """
+        write = output.write
+        delimiter = self.delimiter
+        output_buffer = self._output_buffer
+        while output_buffer:
+            write(output_buffer.popleft() + delimiter)  # type: ignore
 
     def _process_line_internal(
         self,
@@ -287,78 +292,84 @@ class UniqSeq:
         self.line_num_input += 1
 
         # === FILTER EVALUATION: Determine if line should be deduplicated ===
-        filter_action, matched_pattern = evaluate_filter(line, self.filter_patterns)
-        should_deduplicate = filter_action in ("track", None)
-
-        # Filtered lines go to separate buffer, bypassing deduplication pipeline
-        if not should_deduplicate:
-            action_desc = get_bypass_description(filter_action, matched_pattern)
-            print_explain(f"Line {self.line_num_input} bypassed ({action_desc})", self.explain)
-            self.filtered_lines.append((self.line_num_input, line))
-            self._emit_merged_lines()
-            return
+        # (skipped entirely in the common no-filter configuration)
+        if self.filter_patterns:
+            filter_action, matched_pattern = evaluate_filter(line, self.filter_patterns)
+            should_deduplicate = filter_action in ("track", None)
+
+            # Filtered lines go to separate buffer, bypassing deduplication pipeline
+            if not should_deduplicate:
+                if self.explain:
+                    action_desc = get_bypass_description(filter_action, matched_pattern)
+                    print_explain(
+                        f"Line {self.line_num_input} bypassed ({action_desc})", self.explain
+                    )
+                self.filtered_lines.append((self.line_num_input, line))
+                self._emit_merged_lines()
+                return
 
         # For lines that participate in deduplication, prepare and buffer the line
         self.line_num_input_tracked += 1
-        buffered_line = prepare_line_for_deduplication(
+        line_num_input_tracked = self.line_num_input_tracked
+        buffered_line, line_hash = prepare_line_for_deduplication(
             line,
             self.line_num_input,
-            self.line_num_input_tracked,
+            line_num_input_tracked,
             self.skip_chars,
             self.hash_transform,
         )
         self.line_buffer.append(buffered_line)
 
-        # Need full window before processing deduplication
-        if len(self.line_buffer) < self.window_size:
+        # Slide the window hash forward (None until the first full window)
+        current_window_hash = self._window_hasher.push(line_hash)
+        if current_window_hash is None:
             return
 
-        # Calculate window hash and update history sequence position for overlap checking
-        current_window_hash, current_window_start = calculate_window_hash(
-            self.line_buffer, self.window_size
-        )
+        window_size = self.window_size
+        active_matches = self.active_matches
+
+        # Update history sequence position for overlap checking
+        current_window_start = line_num_input_tracked - window_size + 1
         # Must be done BEFORE updating matches, so they can check overlap correctly
         self.history_sequence.current_input_position = current_window_start
 
         # === PHASE 1: Update existing active matches and collect divergences ===
-        all_diverged = update_active_matches(self.active_matches, current_window_hash)
-
-        # Handle all diverged matches with smart deduplication
-        handle_diverged_matches(
-            all_diverged,
-            self.active_matches,
-            self.line_buffer,
-            self.diverged_match_ranges,
-            self._output_buffer,
-            self.window_size,
-            self.save_sequence_callback,
-            self.annotate,
-            self.annotation_format,
-            self.delimiter,
-            self.inverse,
-            self.explain,
-        )
+        if active_matches:
+            all_diverged = update_active_matches(active_matches, current_window_hash)
+
+            # Handle all diverged matches with smart deduplication
+            if all_diverged:
+                handle_diverged_matches(
+                    all_diverged,
+                    active_matches,
+                    self.line_buffer,
+                    self.diverged_match_ranges,
+                    self._output_buffer,
+                    window_size,
+                    self.save_sequence_callback,
+                    self.annotate,
+                    self._format_annotation,
+                    self.inverse,
+                    self.explain,
+                )
 
         # === PHASE 2: Start new potential matches ===
         check_for_new_matches(
             current_window_hash,
             self.sequence_window_index,
-            self.active_matches,
-            self.line_num_input_tracked,
+            self.window_hash_history,
+            self.history_sequence,
+            active_matches,
+            line_num_input_tracked,
             self.line_num_output,
-            self.window_size,
+            window_size,
             self.delimiter,
         )
 
         # === PHASE 4: Add to history ===
         # The overlap check in check_for_new_matches prevents matching against
         # overlapping positions, so we can add to history immediately
-        add_to_history_and_index(
-            current_window_hash,
-            self.window_hash_history,
-            self.history_sequence,
-            self.sequence_window_index,
-        )
+        self.window_hash_history.append(current_window_hash)
 
         # === PHASE 5: Emit lines not consumed by active matches ===
         self._emit_merged_lines()
@@ -374,61 +385,75 @@ class UniqSeq:
         Merges deduplicated lines and filtered lines, adding them to the output buffer
         in the order they appeared in the input stream.
         """
+        # Bind per-call state to locals: the loop runs for every emitted line
+        line_buffer = self.line_buffer
+        filtered_lines = self.filtered_lines
+        output_buffer = self._output_buffer
+        diverged_match_ranges = self.diverged_match_ranges
+        window_hash_history = self.window_hash_history
+        inverse = self.inverse
+        explain = self.explain
+        line_num_output = self.line_num_output
+        lines_skipped = self.lines_skipped
+
         # Calculate minimum buffer depth required
         min_required_depth = calculate_min_buffer_depth(
             self.active_matches,
             self.window_size,
             self.line_num_input_tracked,
-            len(self.line_buffer),
+            len(line_buffer),
         )
 
         # Emit lines in order by comparing line numbers from both buffers
         while True:
             # Determine what we can emit from deduplication buffer
-            dedup_can_emit = len(self.line_buffer) > min_required_depth
+            dedup_can_emit = len(line_buffer) > min_required_depth
             dedup_line_num: Union[int, float] = (
-                self.line_buffer[0].input_line_num if dedup_can_emit else float("inf")
+                line_buffer[0].input_line_num if dedup_can_emit else float("inf")
             )
 
             # Filtered lines can only be emitted if they come before buffered lines
-            filtered_can_emit = len(self.filtered_lines) > 0
+            filtered_can_emit = len(filtered_lines) > 0
             filtered_line_num: Union[int, float]
-            if filtered_can_emit and len(self.line_buffer) > 0:
+            if filtered_can_emit and line_buffer:
                 # Check if filtered line comes before EARLIEST line in buffer
-                filtered_line_num = self.filtered_lines[0][0]
-                filtered_can_emit = filtered_line_num < self.line_buffer[0].input_line_num
+                filtered_line_num = filtered_lines[0][0]
+                filtered_can_emit = filtered_line_num < line_buffer[0].input_line_num
             else:
-                filtered_line_num = self.filtered_lines[0][0] if filtered_can_emit else float("inf")
+                filtered_line_num = filtered_lines[0][0] if filtered_can_emit else float("inf")
 
             # Emit whichever has the lower line number (earlier in input)
             if dedup_can_emit and dedup_line_num <= filtered_line_num:
                 # Emit from deduplication buffer
-                buffered_line = self.line_buffer.popleft()
+                buffered_line = line_buffer.popleft()
                 output_delta, skip_delta = handle_line_emission(
                     buffered_line,
-                    self.diverged_match_ranges,
-                    self._output_buffer,
-                    self.window_hash_history.position_to_entry,
-                    self.inverse,
-                    self.explain,
+                    diverged_match_ranges,
+                    output_buffer,
+                    window_hash_history,
+                    inverse,
+                    explain,
                 )
-                self.line_num_output += output_delta
-                self.lines_skipped += skip_delta
+                line_num_output += output_delta
+                lines_skipped += skip_delta
                 # Update history entry with actual line number if needed
                 if output_delta > 0:
                     hist_pos = buffered_line.tracked_line_num - 1
-                    entry = self.window_hash_history.position_to_entry.get(hist_pos)
+                    entry = window_hash_history.get_entry(hist_pos)
                     if entry and entry.first_output_line == -1:
-                        entry.first_output_line = self.line_num_output
+                        entry.first_output_line = line_num_output
             elif filtered_can_emit and filtered_line_num < dedup_line_num:
                 # Emit from filtered buffer
-                _, line = self.filtered_lines.popleft()
-                self._write_line(line)
-                self.line_num_output += 1
+                _, line = filtered_lines.popleft()
+                output_buffer.append(line)
+                line_num_output += 1
             else:
                 # Nothing to emit
                 break
 
+        self.line_num_output = line_num_output
+        self.lines_skipped = lines_skipped
+
     def flush(self) -> None:
         """Emit remaining buffered lines to output buffer at EOF."""
         # Handle any remaining active matches at EOF
@@ -444,43 +469,58 @@ class UniqSeq:
                 self.window_size,
                 self.save_sequence_callback,
                 self.annotate,
-                self.annotation_format,
-                self.delimiter,
+                self._format_annotation,
                 self.inverse,
                 self.explain,
             )
 
         # Flush remaining lines from both buffers in order
-        while self.line_buffer or self.filtered_lines:
-            dedup_line_num = (
-                self.line_buffer[0].input_line_num if self.line_buffer else float("inf")
+        # (none of these attributes is rebound below, so bind them once)
+        line_buffer = self.line_buffer
+        filtered_lines = self.filtered_lines
+        output_buffer = self._output_buffer
+        diverged_match_ranges = self.diverged_match_ranges
+        window_hash_history = self.window_hash_history
+        inverse = self.inverse
+        explain = self.explain
+        # Counters accumulate in locals and are stored back once after the loop
+        line_num_output = self.line_num_output
+        lines_skipped = self.lines_skipped
+        while line_buffer:
+            # Emit a filtered line first if it came earlier in the input
+            if filtered_lines and filtered_lines[0][0] < line_buffer[0].input_line_num:
+                _, line = filtered_lines.popleft()
+                output_buffer.append(line)
+                line_num_output += 1
+                continue
+
+            buffered_line = line_buffer.popleft()
+            output_delta, skip_delta = handle_line_emission(
+                buffered_line,
+                diverged_match_ranges,
+                output_buffer,
+                window_hash_history,
+                inverse,
+                explain,
             )
-            filtered_line_num = self.filtered_lines[0][0] if self.filtered_lines else float("inf")
+            line_num_output += output_delta
+            lines_skipped += skip_delta
 
-            # Emit whichever has the lower line number
-            if dedup_line_num <= filtered_line_num:
-                buffered_line = self.line_buffer.popleft()
-                output_delta, skip_delta = handle_line_emission(
-                    buffered_line,
-                    self.diverged_match_ranges,
-                    self._output_buffer,
-                    self.window_hash_history.position_to_entry,
-                    self.inverse,
-                    self.explain,
-                )
-                self.line_num_output += output_delta
-                self.lines_skipped += skip_delta
+            # Update history entry with actual line number if needed
+            if output_delta > 0:
+                hist_pos = buffered_line.tracked_line_num - 1
+                entry = window_hash_history.get_entry(hist_pos)
+                if entry and entry.first_output_line == -1:
+                    entry.first_output_line = line_num_output
 
-                # Update history entry with actual line number if needed
-                if output_delta > 0:
-                    hist_pos = buffered_line.tracked_line_num - 1
-                    entry = self.window_hash_history.position_to_entry.get(hist_pos)
-                    if entry and entry.first_output_line == -1:
-                        entry.first_output_line = self.line_num_output
-            else:
-                _, line = self.filtered_lines.popleft()
-                self._write_line(line)
-                self.line_num_output += 1
+        # Remaining filtered lines all follow the last buffered line: emit them in one batch
+        if filtered_lines:
+            output_buffer.extend([line for _, line in filtered_lines])
+            line_num_output += len(filtered_lines)
+            filtered_lines.clear()
+
+        self.line_num_output = line_num_output
+        self.lines_skipped = lines_skipped
 
     def get_stats(self) -> dict[str, Union[int, float]]:
         """
@@ -499,12 +539,3 @@ class UniqSeq:
             "redundancy_pct": redundancy_pct,
             "unique_sequences": len(self.sequence_records),
         }
-
-    def _write_line(self, line: Union[str, bytes]) -> None:
-        """Add a line to the output buffer.
-
-        Args:
-            line: Line to write (str or bytes, without delimiter)
-        """
-        # Append line to output buffer (no delimiter - that's added when writing to stream)
-        self._output_buffer.append(line)
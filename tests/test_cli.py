@@ -1532,10 +1532,10 @@ def test_max_history_1_with_track_pattern():
 
     With max-history=1, the algorithm can only remember one window hash position
     in history at a time. This tests the history eviction behavior where evicted
-    entries are properly removed from sequence_window_index.
+    entries are properly removed from the history index.
 
-    The bug being tested: evicted history entries were not being removed from
-    sequence_window_index, allowing invalid matches against evicted positions.
+    The bug being tested: evicted history entries were not being removed from the
+    index, allowing invalid matches against evicted positions.
     """
     from uniqseq import UniqSeq
 
@@ -613,7 +613,7 @@ def test_hash_line_with_bytes():
     hash2 = hash_line(line_bytes)
 
     assert hash1 == hash2
-    assert len(hash1) == 16  # 8 bytes = 16 hex chars
+    assert 0 <= hash1 < 2**64  # 8-byte digest
 
     # Test with skip_chars
     line_with_prefix = b"PREFIX: test line"
@@ -1179,6 +1179,49 @@ def test_annotation_format_minimal():
     assert "... skipped 2x ..." in result
 
 
+@pytest.mark.unit
+def test_annotation_format_literals_and_format_specs():
+    """Test annotation templates with literal percent signs, braces, and format specs."""
+    lines = []
+    for i in range(10):
+        lines.append(f"line-{i}")
+    for i in range(10):  # Duplicate
+        lines.append(f"line-{i}")
+
+    for custom_format, expected in [
+        ("100% {{dup}} {start}-{end}", "100% {dup} 11-20"),
+        ("[{start:>4}|{count!r}]", "[  11|2]"),
+    ]:
+        output = StringIO()
+        uniqseq = UniqSeq(window_size=10, annotate=True, annotation_format=custom_format)
+        for line in lines:
+            uniqseq.process_line(line, output)
+        uniqseq.flush_to_stream(output)
+
+        assert expected in output.getvalue()
+
+
+@pytest.mark.unit
+def test_annotation_binary_mode():
+    """Test annotations are emitted as UTF-8 bytes in binary mode."""
+    lines = [f"line-{i}".encode() for i in range(10)] * 2
+
+    for custom_format, expected in [
+        ("skipped {start}-{end} → {match_start}-{match_end}", "skipped 11-20 → 1-10"),
+        ("100% {{dup}} [{start:>4}|{count!r}]", "100% {dup} [  11|2]"),
+    ]:
+        uniqseq = UniqSeq(
+            window_size=10,
+            delimiter=b"\x00",
+            annotate=True,
+            annotation_format=custom_format,
+        )
+        output = list(uniqseq.process_lines(lines))
+
+        assert output[:10] == lines[:10]
+        assert output[10:] == [expected.encode()]
+
+
 @pytest.mark.unit
 def test_preloaded_sequence_saving_on_first_observation():
     """Test that preloaded sequences are saved when first observed."""
@@ -2,7 +2,7 @@
 
 import pytest
 
-from uniqseq.hashing import hash_line, hash_window
+from uniqseq.hashing import RollingWindowHash, hash_line, hash_window
 
 
 @pytest.mark.unit
@@ -23,16 +23,15 @@ class TestHashing:
         assert hash1 != hash2
 
     def test_hash_line_size(self):
-        """Line hash is 8 bytes (16 hex chars)."""
+        """Line hash is an 8-byte (64-bit) unsigned integer."""
         hash_val = hash_line("test")
-        assert len(hash_val) == 16
-        # Verify it's valid hex
-        int(hash_val, 16)  # Raises if not valid hex
+        assert isinstance(hash_val, int)
+        assert 0 <= hash_val < 2**64
 
     def test_hash_line_empty_string(self):
         """Empty string produces valid hash."""
         hash_val = hash_line("")
-        assert len(hash_val) == 16
+        assert 0 <= hash_val < 2**64
 
     def test_hash_line_special_characters(self):
         """Special characters handled correctly."""
@@ -49,32 +48,31 @@ class TestHashing:
         # All should be valid and different
         assert len(set(hashes)) == len(lines)
         for h in hashes:
-            assert len(h) == 16
+            assert 0 <= h < 2**64
 
     def test_hash_window_deterministic(self):
         """Same window produces same hash."""
-        hashes = ["h1", "h2", "h3"]
+        hashes = [0xA1, 0xB2, 0xC3]
         hash1 = hash_window(10, hashes)
         hash2 = hash_window(10, hashes)
         assert hash1 == hash2
 
     def test_hash_window_size(self):
-        """Window hash is 16 bytes (32 hex chars)."""
-        window_hashes = ["abc123", "def456", "ghi789"]
+        """Window hash is a 127-bit unsigned integer."""
+        window_hashes = [0xABC123, 0xDEF456, 0x789ABC]
         hash_val = hash_window(10, window_hashes)
-        assert len(hash_val) == 32
-        # Verify it's valid hex
-        int(hash_val, 16)
+        assert isinstance(hash_val, int)
+        assert 0 <= hash_val < 2**127
 
     def test_hash_window_order_matters(self):
         """Window hash changes if order changes."""
-        hash1 = hash_window(10, ["h1", "h2", "h3"])
-        hash2 = hash_window(10, ["h3", "h2", "h1"])
+        hash1 = hash_window(10, [0xA1, 0xB2, 0xC3])
+        hash2 = hash_window(10, [0xC3, 0xB2, 0xA1])
         assert hash1 != hash2
 
     def test_hash_window_length_affects_hash(self):
         """Sequence length affects window hash."""
-        hashes = ["h1", "h2", "h3"]
+        hashes = [0xA1, 0xB2, 0xC3]
         hash1 = hash_window(10, hashes)
         hash2 = hash_window(15, hashes)
         assert hash1 != hash2
@@ -82,12 +80,12 @@ class TestHashing:
     def test_hash_window_empty_list(self):
         """Empty window list produces valid hash."""
         hash_val = hash_window(10, [])
-        assert len(hash_val) == 32
+        assert 0 <= hash_val < 2**127
 
     def test_hash_window_single_hash(self):
         """Single hash in window."""
-        hash_val = hash_window(5, ["single"])
-        assert len(hash_val) == 32
+        hash_val = hash_window(5, [0x5E1F])
+        assert 0 <= hash_val < 2**127
 
     def test_hash_line_collision_resistance(self):
         """Very similar lines produce different hashes."""
@@ -102,3 +100,17 @@ class TestHashing:
         hashes = [hash_line(line) for line in lines]
         # All should be unique
         assert len(set(hashes)) == len(lines)
+
+    def test_rolling_window_hash_matches_hash_window(self):
+        """Rolling window hash equals hashing each full window from scratch."""
+        line_hashes = [hash_line(f"line {i % 7}") for i in range(40)]
+
+        for window_size in [1, 2, 5, 10]:
+            rolling = RollingWindowHash(window_size)
+            for i, line_hash in enumerate(line_hashes):
+                window_hash = rolling.push(line_hash)
+                if i + 1 < window_size:
+                    assert window_hash is None
+                else:
+                    window = line_hashes[i + 1 - window_size : i + 1]
+                    assert window_hash == hash_window(window_size, window)
@@ -364,6 +364,32 @@ def test_active_match_manager_discard_nonexistent():
     assert match1 in manager
 
 
+@pytest.mark.unit
+def test_active_match_manager_alignment_tracking():
+    """Test that alignment keys follow matches through add, discard and clear."""
+    from uniqseq.matching import RecordedSubsequenceMatch
+    from uniqseq.uniqseq import ActiveMatchManager, RecordedSequence
+
+    seq = RecordedSequence(first_output_line=1, window_hashes=[1, 2, 3], counts=None)
+    manager = ActiveMatchManager(max_candidates=10)
+
+    # Match started at tracked line 5 against window 1 of seq
+    match = RecordedSubsequenceMatch(0, 5, seq, "\n", 1)
+    manager.try_add(match)
+    assert manager.has_alignment((seq, 1 - 5))
+
+    # Two windows later the same match covers window 3 starting at line 7
+    assert manager.has_alignment((seq, 3 - 7))
+    assert not manager.has_alignment((seq, 3 - 5))
+
+    manager.discard(match)
+    assert not manager.has_alignment((seq, 1 - 5))
+
+    manager.try_add(match)
+    manager.clear()
+    assert not manager.has_alignment((seq, 1 - 5))
+
+
 @pytest.mark.unit
 def test_sequence_registry_iteration():
     """Test SequenceRegistry.__iter__() returns sequences in LRU order."""
@@ -99,6 +99,19 @@ class TestPositionalFIFO:
         assert fifo.get_key(3) == "item_3"
         assert fifo.get_key(4) == "item_4"
 
+    def test_lookups_across_many_evictions(self):
+        """Positions stay addressable while evicted slots are trimmed."""
+        fifo = PositionalFIFO(maxsize=3)
+
+        for i in range(50):
+            fifo.append(f"item_{i}")
+
+        assert fifo.get_key(46) is None
+        assert fifo.get_entry(46) is None
+        assert [fifo.get_key(p) for p in range(47, 50)] == ["item_47", "item_48", "item_49"]
+        assert fifo.get_key(50) is None
+        assert fifo.get_key(-1) is None
+
     def test_same_key_multiple_positions(self):
         """Same key can appear at multiple positions."""
         fifo = PositionalFIFO(maxsize=10)